@@ -1,20 +1,38 @@
 import os
+import re
+import json
+import asyncio
+import time
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from fastapi import FastAPI, Depends, HTTPException
+import anyio.to_thread
+import faiss
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.stores import ByteStore
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.documents import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 
 # MongoDB + Auth
-from pymongo import MongoClient
-from pymongo.errors import ConfigurationError
+from pymongo import AsyncMongoClient
+from pymongo.errors import ConfigurationError, DuplicateKeyError
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 
@@ -24,50 +42,140 @@ if "OPENAI_API_KEY" not in os.environ:
 else:
     print("OPENAI_API_KEY is set")
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+UI_PATH = os.path.join(STATIC_DIR, "index.html")
+FAISS_INDEX_DIR = os.path.join(BASE_DIR, "faiss_index")
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, ".emb_cache"))
+# Each cached vector is a ~30 KB file; /chat is public, so the directory is capped
+EMBEDDING_CACHE_MAX_FILES = int(os.environ.get("EMBEDDING_CACHE_MAX_FILES", "5000"))
+
 MONGODB_URI = os.environ.get("MONGODB_URI")
 MONGODB_URI_STANDARD = os.environ.get("MONGODB_URI_STANDARD")  # fallback: use standard mongodb:// if mongodb+srv fails
 JWT_SECRET = os.environ.get("JWT_SECRET", "change-me-in-production")
 JWT_ALGORITHM = "HS256"
+# Cross-origin frontends allowed to call the API (comma-separated); the bundled /ui is same-origin
+CORS_ORIGINS = [o.strip() for o in os.environ.get("CORS_ORIGINS", "").split(",") if o.strip()]
 JWT_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Map the index file instead of copying it into process memory (read-only: the app never adds vectors)
+FAISS_IO_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+FAISS_NPROBE = 10  # IVF clusters scanned per query (ignored for flat indexes)
+RETRIEVER_K = 4
+# OpenAI client: the SDK retries 429/5xx with exponential backoff and honours Retry-After
+OPENAI_MAX_RETRIES = 5
+OPENAI_TIMEOUT_SECONDS = 30.0
+OPENAI_MAX_CONCURRENCY = 3500 // 60  # in-flight RAG calls, sized for a 3500 RPM quota
+THREADPOOL_SIZE = 64  # worker threads for bcrypt and other blocking calls (anyio default: 40)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = 11  # passlib default is 12; each step down halves hash/verify time
+# Cost of hashes stored before BCRYPT_ROUNDS was pinned; they are rehashed on successful login
+LEGACY_BCRYPT_ROUNDS = 12
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=BCRYPT_ROUNDS, deprecated="auto")
 security = HTTPBearer(auto_error=False)
 
-_db_client = None
+# One pooled client per configured URI, built once and shared by every request
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": 100,
+    "minPoolSize": 10,
+    "serverSelectionTimeoutMS": 5000,
+    "socketTimeoutMS": 10000,
+    "retryWrites": True,
+}
+
+# Async clients are bound to the event loop that first uses them, so they are opened and
+# closed by the app lifespan rather than at import
+_db_clients = []
 _db = None
+# True once the unique users.email index is confirmed; until then signup keeps its find_one guard
+_email_index_ready = False
+
+def open_db_clients():
+    global _db_clients, _db, _email_index_ready
+    # The async client resolves mongodb+srv lazily, so SRV/DNS problems surface as a
+    # ConfigurationError from the first command rather than from the constructor
+    _db_clients = [AsyncMongoClient(uri, **MONGO_CLIENT_OPTIONS) for uri in (MONGODB_URI, MONGODB_URI_STANDARD) if uri]
+    _db = None
+    _email_index_ready = False
+
+async def close_db_clients():
+    global _db_clients, _db
+    clients, _db_clients, _db = _db_clients, [], None
+    for client in clients:
+        await client.close()
 
-def get_db():
-    global _db_client, _db
-    uris_to_try = [u for u in (MONGODB_URI, MONGODB_URI_STANDARD) if u]
-    if not uris_to_try:
-        return None
+async def _ensure_indexes(db):
+    global _email_index_ready
+    # create_index is idempotent; chats_list reads by userId sorted by createdAt
+    try:
+        await db["chats"].create_index([("userId", 1), ("createdAt", 1)])
+    except Exception as e:
+        print(f"MongoDB chats index creation failed: {e}")
+    try:
+        await db["users"].create_index("email", unique=True)
+        _email_index_ready = True
+    except Exception as e:
+        print(f"MongoDB users.email unique index creation failed: {e}")
+
+async def get_db():
+    global _db
     if _db is not None:
         return _db
-    for uri in uris_to_try:
+    for client in _db_clients:
         try:
-            _db_client = MongoClient(uri, serverSelectionTimeoutMS=10000)
-            _db = _db_client.get_default_database()
-            _db_client.admin.command("ping")
-            return _db
+            await client.admin.command("ping")
+            db = client.get_default_database()
         except ConfigurationError as e:
-            print(f"MongoDB ConfigurationError with {uri[:30]}...: {e}")
+            print(f"MongoDB ConfigurationError: {e}")
             continue
         except Exception as e:
             print(f"MongoDB connection error: {e}")
             continue
+        await _ensure_indexes(db)
+        _db = db
+        return _db
     return None
 
+# Hash checked when the login email is unknown, so misses cost the same bcrypt verify as hits.
+# It uses the legacy cost while 12-round hashes remain; drop to BCRYPT_ROUNDS once they are migrated.
+_dummy_hash = None
+
+def get_dummy_hash():
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = pwd_context.handler("bcrypt").using(rounds=LEGACY_BCRYPT_ROUNDS).hash("x" * 12)
+    return _dummy_hash
+
+def check_password(password: str, user):
+    """Return (ok, new_hash); new_hash is set when the stored hash should be upgraded."""
+    stored = user.get("password") if user else None
+    ok, new_hash = pwd_context.verify_and_update(password, stored or get_dummy_hash())
+    if not stored:
+        return False, None
+    return ok, new_hash
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=JWT_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+@functools.lru_cache(maxsize=4096)
+def _verify_token(token: str) -> dict:
+    # Only successful decodes are cached; invalid tokens raise and are re-checked each time
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+def decode_token(token: str) -> dict:
+    payload = _verify_token(token)
+    exp = payload.get("exp")
+    if exp is not None and exp < time.time():
+        raise JWTError("Token expired")
+    return payload
+
 def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security)):
     if not creds:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
-        payload = jwt.decode(creds.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(creds.credentials)
         user_id = payload.get("sub")
         email = payload.get("email")
         if not user_id:
@@ -76,6 +184,257 @@ def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# --- Answer cache: repeated questions skip retrieval and the LLM call ---
+class QueryCache:
+    """Thread-safe LRU cache whose entries expire after ttl_seconds."""
+
+    def __init__(self, max_size=1000, ttl_seconds=600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+def question_cache_key(question: str) -> str:
+    normalized = re.sub(r"\s+", " ", question).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+answer_cache = QueryCache(max_size=1000, ttl_seconds=600)
+
+# --- Embedding cache: question vectors keyed by SHA-256 of the text ---
+class LRUByteStore(ByteStore):
+    """Bounded in-memory layer in front of another byte store."""
+
+    def __init__(self, backing: ByteStore, max_size=1000):
+        self._backing = backing
+        self._cache = QueryCache(max_size=max_size, ttl_seconds=float("inf"))
+
+    def mget(self, keys):
+        values = [self._cache.get(k) for k in keys]
+        missing = [k for k, v in zip(keys, values) if v is None]
+        if missing:
+            found = dict(zip(missing, self._backing.mget(missing)))
+            for i, k in enumerate(keys):
+                if values[i] is None and found.get(k) is not None:
+                    values[i] = found[k]
+                    self._cache.set(k, found[k])
+        return values
+
+    def mset(self, key_value_pairs):
+        key_value_pairs = list(key_value_pairs)
+        self._backing.mset(key_value_pairs)
+        for k, v in key_value_pairs:
+            self._cache.set(k, v)
+
+    def mdelete(self, keys):
+        self._backing.mdelete(keys)
+        for k in keys:
+            self._cache.delete(k)
+
+    def yield_keys(self, prefix=None):
+        return self._backing.yield_keys(prefix=prefix)
+
+class BoundedLocalFileStore(LocalFileStore):
+    """LocalFileStore capped at max_files; evicts the least recently read files (by atime)."""
+
+    PRUNE_TO = 0.9  # prune to 90% of the cap so eviction does not run on every write
+
+    def __init__(self, root_path, max_files=5000):
+        # update_atime sets atime explicitly on reads, so it works on noatime mounts too
+        super().__init__(root_path, update_atime=True)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._count = None
+
+    def mset(self, key_value_pairs):
+        key_value_pairs = list(key_value_pairs)
+        super().mset(key_value_pairs)
+        with self._lock:
+            # Overwrites over-count, which only makes the next prune (a real listing) come earlier
+            if self._count is None:
+                self._count = len(self._stat_files())
+            else:
+                self._count += len(key_value_pairs)
+            if self._count > self.max_files:
+                self._prune()
+
+    def _stat_files(self):
+        entries = []
+        for path in self.root_path.rglob("*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another worker sharing the directory
+            if path.is_file():
+                entries.append((st.st_atime, path))
+        return entries
+
+    def _prune(self):
+        entries = sorted(self._stat_files(), key=lambda e: e[0])
+        excess = max(len(entries) - int(self.max_files * self.PRUNE_TO), 0)
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+        self._count = len(entries) - excess
+
+def build_embeddings():
+    underlying = OpenAIEmbeddings(max_retries=OPENAI_MAX_RETRIES, request_timeout=OPENAI_TIMEOUT_SECONDS)
+    disk = BoundedLocalFileStore(EMBEDDING_CACHE_DIR, max_files=EMBEDDING_CACHE_MAX_FILES)
+    store = LRUByteStore(disk, max_size=1000)
+    return CacheBackedEmbeddings.from_bytes_store(
+        underlying,
+        store,
+        namespace=underlying.model,
+        query_embedding_cache=True,
+        key_encoder="sha256",
+    )
+
+# --- Micro-batching: concurrent /chat questions share one embeddings request ---
+class EmbeddingBatcher:
+    """Collects texts for up to max_wait_ms (or max_batch items) and embeds them in one call."""
+
+    def __init__(self, embeddings, max_batch=32, max_wait_ms=20):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._pending = set()
+
+    async def embed(self, text: str):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queue and worker are bound to the loop they were created on
+            self._stop_worker()
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run(self._queue))
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _stop_worker(self):
+        if self._worker is None:
+            return
+        # A closed loop has already taken its tasks down with it
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._worker.cancel)
+        self._worker = None
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _run(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Embed in the background so the next batch can start collecting
+            self._spawn(self._flush(batch))
+
+    async def _flush(self, batch):
+        try:
+            vectors = await self.embeddings.aembed_documents([text for text, _ in batch])
+            # A short response must fail the callers, not leave their futures pending forever
+            results = list(zip(batch, vectors, strict=True))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in results:
+            if not future.done():
+                future.set_result(vector)
+
+class BatchedRetriever(BaseRetriever):
+    """FAISS retriever that gets its query vector from an EmbeddingBatcher."""
+
+    vectorstore: FAISS
+    batcher: EmbeddingBatcher
+    k: int = 4
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return self.vectorstore.similarity_search(query, k=self.k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        vector = await self.batcher.embed(query)
+        return self.vectorstore.similarity_search_by_vector(vector, k=self.k)
+
+# --- RAG prompt and helpers: built once at import ---
+RAG_TEMPLATE = """Use the following pieces of context to answer the question.
+If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+Context: {context}
+
+Question: {question}
+
+Helpful Answer: """
+
+rag_prompt = ChatPromptTemplate.from_template(RAG_TEMPLATE)
+
+def format_docs(docs):
+    return "\n\n".join([d.page_content for d in docs])
+
+@functools.lru_cache(maxsize=1)
+def get_llm():
+    # Deferred until first use: ChatOpenAI() fails at construction without OPENAI_API_KEY
+    return ChatOpenAI(
+        model_name="gpt-3.5-turbo",
+        temperature=0,
+        max_retries=OPENAI_MAX_RETRIES,
+        request_timeout=OPENAI_TIMEOUT_SECONDS,
+    )
+
 # --- Lazy loading: Initialize RAG components on first use ---
 rag_chain = None
 
@@ -83,113 +442,164 @@ def get_rag_chain():
     global rag_chain
     if rag_chain is None:
         print("Loading RAG model and vector store...")
-        embeddings = OpenAIEmbeddings()
+        embeddings = build_embeddings()
         vectorstore = FAISS.load_local(
-            "faiss_index", 
-            embeddings, 
-            allow_dangerous_deserialization=True 
+            FAISS_INDEX_DIR,
+            embeddings,
+            allow_dangerous_deserialization=True,
+            io_flags=FAISS_IO_FLAGS,
         )
-        retriever = vectorstore.as_retriever()
-        
-        # RAG Prompt template
-        template = """Use the following pieces of context to answer the question.
-If you don't know the answer, just say that you don't know, don't try to make up an answer.
+        ivf = faiss.try_extract_index_ivf(vectorstore.index)
+        if ivf is not None:
+            ivf.nprobe = FAISS_NPROBE
+        retriever = BatchedRetriever(vectorstore=vectorstore, batcher=EmbeddingBatcher(embeddings), k=RETRIEVER_K)
 
-Context: {context}
-
-Question: {question}
-
-Helpful Answer: """
-        
-        prompt = ChatPromptTemplate.from_template(template)
-        
-        # LLM model
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
-        
         # RAG Chain using LCEL
-        def format_docs(docs):
-            return "\n\n".join([d.page_content for d in docs])
-        
         rag_chain = (
             {"context": retriever | format_docs, "question": RunnablePassthrough()}
-            | prompt
-            | llm
+            | rag_prompt
+            | get_llm()
             | StrOutputParser()
         )
         print("✅ RAG Application is ready.")
     return rag_chain
 
-app = FastAPI()
+# Caps concurrent chain runs so bursts queue here instead of tripping OpenAI 429s.
+# Created per event loop (see lifespan); get_openai_slots covers use without a lifespan.
+openai_slots = None
+
+def get_openai_slots():
+    global openai_slots
+    if openai_slots is None:
+        openai_slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return openai_slots
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global openai_slots
+    openai_slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Pay the index load at boot; if it fails (e.g. no API key) /chat retries lazily
+    try:
+        await run_in_threadpool(get_rag_chain)
+    except Exception as e:
+        print(f"RAG warm-up failed, will load on first /chat: {e}")
+    # passlib loads its bcrypt backend on first use; do it before the first signup/login
+    try:
+        await run_in_threadpool(get_dummy_hash)
+    except Exception as e:
+        print(f"Password hasher warm-up failed: {e}")
+    # Connecting creates the MongoDB indexes; if Mongo is not reachable yet, later requests retry
+    open_db_clients()
+    await get_db()
+    try:
+        yield
+    finally:
+        await close_db_clients()
+        openai_slots = None
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # let browsers cache preflight results for a day
 )
 
+# Length bounds reject oversized payloads before they reach bcrypt, MongoDB or OpenAI
 class Query(BaseModel):
-    question: str
+    question: str = Field(min_length=1, max_length=4000)
 
 class SignUp(BaseModel):
-    email: str
-    password: str
+    email: EmailStr
+    password: str = Field(min_length=8, max_length=128)
 
 class ChatSave(BaseModel):
-    question: str
+    question: str = Field(max_length=4000)
+    answer: str = Field("", max_length=16000)
+    error: str = Field("", max_length=2000)
+
+class ChatItem(BaseModel):
+    question: str = ""
     answer: str = ""
     error: str = ""
+    createdAt: datetime | None = None
+
+class ChatList(BaseModel):
+    chats: list[ChatItem]
 
 @app.get("/health")
 def read_root():
     return {"message": "BEE EDU RAG Application is live!", "version": "v1"}
 
+# The UI page is tiny and static: read it once and let browsers revalidate with the ETag
+with open(UI_PATH, "rb") as f:
+    _UI_BYTES = f.read()
+_UI_ETAG = f'"{hashlib.md5(_UI_BYTES).hexdigest()}"'
+_UI_HEADERS = {"ETag": _UI_ETAG, "Cache-Control": "public, max-age=300"}
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    # Weak comparison (RFC 9110): W/"x" matches "x"; the header may list several tags or be *
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
 @app.get("/")
 @app.get("/ui")
-def ui():
-    ui_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "index.html")
-    return FileResponse(ui_path)
+def ui(request: Request):
+    if etag_matches(request.headers.get("if-none-match"), _UI_ETAG):
+        return Response(status_code=304, headers=_UI_HEADERS)
+    return Response(_UI_BYTES, media_type="text/html", headers=_UI_HEADERS)
 
 @app.get("/api/status")
-def api_status():
+async def api_status():
     uris = [u for u in (MONGODB_URI, MONGODB_URI_STANDARD) if u]
     mongo_uri_set = bool(uris)
-    db = None
+    connected = False
     err = None
-    if mongo_uri_set:
-        for uri in uris:
-            try:
-                client = MongoClient(uri, serverSelectionTimeoutMS=10000)
-                db = client.get_default_database()
-                client.admin.command("ping")
-                break
-            except ConfigurationError:
-                err = "ConfigurationError"
-                continue
-            except Exception as e:
-                err = type(e).__name__
-                if "auth" in str(e).lower() or "8000" in str(e):
-                    err = "auth_failed"
-                elif "timeout" in str(e).lower():
-                    err = "timeout"
-                elif "getaddrinfo" in str(e).lower() or "nodename" in str(e).lower():
-                    err = "dns_error"
-                continue
-    return {"mongo": db is not None, "mongo_uri_set": mongo_uri_set, "error": err}
+    for client in _db_clients:
+        try:
+            await client.admin.command("ping")
+            connected = True
+            break
+        except ConfigurationError:
+            err = "ConfigurationError"
+            continue
+        except Exception as e:
+            err = type(e).__name__
+            if "auth" in str(e).lower() or "8000" in str(e):
+                err = "auth_failed"
+            elif "timeout" in str(e).lower():
+                err = "timeout"
+            elif "getaddrinfo" in str(e).lower() or "nodename" in str(e).lower():
+                err = "dns_error"
+            continue
+    return {
+        "mongo": connected,
+        "mongo_uri_set": mongo_uri_set,
+        "error": err,
+        "answer_cache": answer_cache.stats(),
+    }
 
 @app.post("/auth/signup")
-def auth_signup(body: SignUp):
-    db = get_db()
-    if not db:
+async def auth_signup(body: SignUp):
+    db = await get_db()
+    if db is None:
         raise HTTPException(status_code=503, detail="Database not configured")
     try:
         users = db["users"]
-        existing = users.find_one({"email": body.email})
-        if existing:
+        if not _email_index_ready and await users.find_one({"email": body.email}):
             raise HTTPException(status_code=400, detail="Email already registered")
-        hashed = pwd_context.hash(body.password)
+        hashed = await run_in_threadpool(pwd_context.hash, body.password)
         doc = {"email": body.email, "password": hashed, "createdAt": datetime.utcnow()}
-        result = users.insert_one(doc)
+        # With the unique index on users.email, duplicates are rejected in the same round trip
+        try:
+            result = await users.insert_one(doc)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Email already registered")
         user_id = str(result.inserted_id)
         token = create_access_token({"sub": user_id, "email": body.email})
         return {"token": token, "user": {"id": user_id, "email": body.email}}
@@ -200,19 +610,27 @@ def auth_signup(body: SignUp):
         raise HTTPException(status_code=503, detail="Database error")
 
 class Login(BaseModel):
-    email: str
-    password: str
+    # Plain str, no minimums: accounts created before the signup rules must still match and log in
+    email: str = Field(max_length=254)
+    password: str = Field(max_length=128)
 
 @app.post("/auth/login")
-def auth_login(body: Login):
-    db = get_db()
-    if not db:
+async def auth_login(body: Login):
+    db = await get_db()
+    if db is None:
         raise HTTPException(status_code=503, detail="Database not configured")
     try:
         users = db["users"]
-        user = users.find_one({"email": body.email})
-        if not user or not pwd_context.verify(body.password, user.get("password", "")):
+        user = await users.find_one({"email": body.email})
+        ok, new_hash = await run_in_threadpool(check_password, body.password, user)
+        if not ok:
             raise HTTPException(status_code=401, detail="Invalid email or password")
+        if new_hash:
+            # Migrate hashes made with an older bcrypt cost; a failure here must not block login
+            try:
+                await users.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
         user_id = str(user["_id"])
         token = create_access_token({"sub": user_id, "email": user["email"]})
         return {"token": token, "user": {"id": user_id, "email": user["email"]}}
@@ -227,11 +645,11 @@ def auth_me(user: dict = Depends(get_current_user)):
     return {"id": user["id"], "email": user["email"]}
 
 @app.post("/chats")
-def chats_save(body: ChatSave, user: dict = Depends(get_current_user)):
-    db = get_db()
-    if not db:
+async def chats_save(body: ChatSave, user: dict = Depends(get_current_user)):
+    db = await get_db()
+    if db is None:
         raise HTTPException(status_code=503, detail="Database not configured")
-    db["chats"].insert_one({
+    await db["chats"].insert_one({
         "userId": user["id"],
         "question": body.question,
         "answer": body.answer,
@@ -241,30 +659,80 @@ def chats_save(body: ChatSave, user: dict = Depends(get_current_user)):
     return {"ok": True}
 
 @app.get("/chats")
-def chats_list(user: dict = Depends(get_current_user)):
-    db = get_db()
-    if not db:
+async def chats_list(user: dict = Depends(get_current_user)) -> ChatList:
+    db = await get_db()
+    if db is None:
         raise HTTPException(status_code=503, detail="Database not configured")
-    cursor = db["chats"].find({"userId": user["id"]}).sort("createdAt", 1).limit(100)
-    items = []
-    for doc in cursor:
-        items.append({
-            "question": doc.get("question", ""),
-            "answer": doc.get("answer", ""),
-            "error": doc.get("error", ""),
-            "createdAt": doc.get("createdAt").isoformat() if doc.get("createdAt") else None
-        })
-    return {"chats": items}
+    projection = {"_id": 0, "question": 1, "answer": 1, "error": 1, "createdAt": 1}
+    cursor = db["chats"].find({"userId": user["id"]}, projection).sort("createdAt", 1).limit(100)
+    # The ChatList return type lets FastAPI serialize (datetimes included) in pydantic-core
+    return ChatList(chats=[ChatItem(**doc) async for doc in cursor])
+
+ANSWER_PREFIX = "Helpful Answer: V5 "
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+_STREAM_END = object()
+
+async def _generate_into(queue: asyncio.Queue, chain, question: str):
+    try:
+        async with get_openai_slots():
+            async for chunk in chain.astream(question):
+                queue.put_nowait(chunk)
+        queue.put_nowait(_STREAM_END)
+    except Exception as e:
+        queue.put_nowait(e)
 
 @app.post("/chat")
-def chat(query: Query):
+async def chat(query: Query):
+    """Stream the answer as Server-Sent Events: {"delta": ...} chunks, or a final {"error": ...}."""
+    async def events():
+        key = question_cache_key(query.question)
+        try:
+            answer = answer_cache.get(key)
+            if answer is not None:
+                yield sse_event({"delta": ANSWER_PREFIX + answer})
+                return
+            # Lazy load RAG chain on first use (reads the FAISS index from disk)
+            chain = await run_in_threadpool(get_rag_chain)
+            yield sse_event({"delta": ANSWER_PREFIX})
+            # Generation runs in its own task that holds the OpenAI slot only until the model
+            # finishes; a slow reader drains the (unbounded) queue without keeping the slot.
+            queue = asyncio.Queue()
+            producer = asyncio.create_task(_generate_into(queue, chain, query.question))
+            try:
+                parts = []
+                while True:
+                    item = await queue.get()
+                    if item is _STREAM_END:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    parts.append(item)
+                    yield sse_event({"delta": item})
+                answer_cache.set(key, "".join(parts))
+            finally:
+                # Client went away mid-stream: stop generating
+                producer.cancel()
+        except Exception as e:
+            yield sse_event({"error": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/chat/sync")
+async def chat_sync(query: Query):
     try:
-        # Lazy load RAG chain on first use
-        chain = get_rag_chain()
-        answer = chain.invoke(query.question)
-        return {"answer": f"Helpful Answer: V5 {answer}"}
+        key = question_cache_key(query.question)
+        answer = answer_cache.get(key)
+        if answer is None:
+            # Lazy load RAG chain on first use (reads the FAISS index from disk)
+            chain = await run_in_threadpool(get_rag_chain)
+            async with get_openai_slots():
+                answer = await chain.ainvoke(query.question)
+            answer_cache.set(key, answer)
+        return {"answer": f"{ANSWER_PREFIX}{answer}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -1,4 +1,5 @@
 import os
+import faiss
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_community.document_loaders import TextLoader
 from langchain_community.vectorstores import FAISS
@@ -16,10 +17,26 @@ documents = loader.load()
 text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
 docs = text_splitter.split_documents(documents)
 
+# IVF 参数: 聚类数与训练所需的最少向量数 (faiss 建议每个聚类至少 39 个训练点)
+IVF_NLIST = 100
+IVF_MIN_TRAIN_PER_LIST = 39
+
 # 创建向量并存储
 embeddings = OpenAIEmbeddings()
 db = FAISS.from_documents(docs, embeddings)
 
+# 数据量足够时把暴力检索的 Flat 索引换成 IVF, 查询只扫描 nprobe 个聚类
+if db.index.ntotal >= IVF_NLIST * IVF_MIN_TRAIN_PER_LIST:
+    xb = db.index.reconstruct_n(0, db.index.ntotal)
+    quantizer = faiss.IndexFlatL2(db.index.d)
+    ivf_index = faiss.IndexIVFFlat(quantizer, db.index.d, IVF_NLIST)
+    ivf_index.train(xb)
+    ivf_index.add(xb)
+    db.index = ivf_index
+    print(f"Built IVF index with {IVF_NLIST} clusters over {ivf_index.ntotal} vectors")
+else:
+    print(f"Only {db.index.ntotal} vectors, keeping flat index")
+
 # 保存到本地
 db.save_local("faiss_index")
 print("✅ FAISS index has been saved to 'faiss_index'")
\ No newline at end of file
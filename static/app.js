@@ -82,12 +82,30 @@ const renderBotLoading = () => {
   return { wrap, bubble, t };
 };
 
-const typeText = async (el, text) => {
-  el.textContent = '';
-  for (let i = 0; i < text.length; i++) {
-    el.textContent += text[i];
-    await new Promise(r => setTimeout(r, 8));
+// Reads the /chat Server-Sent Events stream, calling onDelta with the text so far
+const readAnswerStream = async (res, onDelta) => {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let answer = '';
+  let error = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const ev of events) {
+      if (!ev.startsWith('data: ')) continue;
+      const msg = JSON.parse(ev.slice(6));
+      if (msg.delta) {
+        answer += msg.delta;
+        onDelta(answer);
+      }
+      if (msg.error) error = msg.error;
+    }
   }
+  return { answer, error };
 };
 
 const saveChat = async (question, answer, error) => {
@@ -199,12 +217,15 @@ document.getElementById('chat-form').addEventListener('submit', async (e) => {
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ question: q })
     });
-    const data = await res.json();
-    const body = Array.isArray(data) ? (data[0] || {}) : data;
-    const text = body.answer || body.error || '请求失败';
+    if (!res.ok || !res.body) throw new Error('Chat request failed');
+    const { answer, error } = await readAnswerStream(res, (text) => {
+      wrap.classList.remove('loading');
+      t.textContent = text;
+      messages.scrollTop = messages.scrollHeight;
+    });
     wrap.classList.remove('loading');
-    await typeText(t, text);
-    await saveChat(q, body.answer || '', body.error || '');
+    t.textContent = error || answer || '请求失败';
+    await saveChat(q, error ? '' : answer, error);
   } catch (err) {
     wrap.classList.remove('loading');
     const msg = '请求错误';
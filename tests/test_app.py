@@ -1,6 +1,7 @@
 import os
 import sys
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from fastapi.testclient import TestClient
 from app import app
 
@@ -14,25 +15,304 @@ def test_root():
     assert "message" in body
 
 def test_chat_endpoint_responds():
-    r = client.post("/chat", json={"question": "hello"})
+    r = client.post("/chat/sync", json={"question": "hello"})
     assert r.status_code in (200, 500)
     raw = r.json()
     body = raw[0] if isinstance(raw, list) and len(raw) == 2 and isinstance(raw[0], dict) else raw
     assert ("answer" in body) or ("error" in body) or ("detail" in body)
 
+def test_chat_streams_sse():
+    r = client.post("/chat", json={"question": "hello"})
+    assert r.status_code == 200
+    assert r.headers.get("content-type", "").startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in r.text.splitlines() if line.startswith("data: ")]
+    assert events
+    assert all(("delta" in e) or ("error" in e) for e in events)
+
 def test_ui_route_serves_html():
     r = client.get("/ui")
     assert r.status_code == 200
     assert "text/html" in r.headers.get("content-type", "")
 
+def test_ui_route_not_modified():
+    etag = client.get("/").headers["etag"]
+    r = client.get("/ui", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    for header in (f"W/{etag}", f'"other", W/{etag}', "*"):
+        assert client.get("/ui", headers={"If-None-Match": header}).status_code == 304
+    assert client.get("/ui", headers={"If-None-Match": '"other"'}).status_code == 200
+
 def test_auth_login_no_db():
     r = client.post("/auth/login", json={"email": "test@test.com", "password": "test123"})
     assert r.status_code in (401, 503)
 
 def test_auth_signup_no_db():
-    r = client.post("/auth/signup", json={"email": "test@test.com", "password": "test123"})
+    r = client.post("/auth/signup", json={"email": "test@test.com", "password": "test1234"})
     assert r.status_code in (400, 503)
 
+def test_auth_signup_rejects_invalid_input():
+    r = client.post("/auth/signup", json={"email": "not-an-email", "password": "test1234"})
+    assert r.status_code == 422
+    r = client.post("/auth/signup", json={"email": "test@test.com", "password": "short"})
+    assert r.status_code == 422
+
+def test_chat_rejects_oversized_question():
+    r = client.post("/chat/sync", json={"question": "x" * 4001})
+    assert r.status_code == 422
+
 def test_chats_unauthorized():
     r = client.get("/chats")
     assert r.status_code == 401
+
+def test_query_cache_lru_and_ttl():
+    from app import QueryCache, question_cache_key
+    cache = QueryCache(max_size=2, ttl_seconds=60)
+    cache.set(question_cache_key("What is  BEE EDU?"), "a")
+    assert cache.get(question_cache_key(" what is bee edu? ")) == "a"
+    cache.set("k2", "b")
+    cache.set("k3", "c")
+    assert cache.get("k2") == "b"
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1 and stats["hits"] == 2
+    expired = QueryCache(ttl_seconds=-1)
+    expired.set("k", "v")
+    assert expired.get("k") is None
+
+def test_embedding_disk_cache_is_bounded(tmp_path):
+    import os
+    from app import BoundedLocalFileStore
+    store = BoundedLocalFileStore(tmp_path, max_files=10)
+    store.mset([("k0", b"v0")])
+    os.utime(tmp_path / "k0", (1, 1))  # least recently read
+    store.mset([(f"k{i}", b"v") for i in range(1, 12)])
+    names = {p.name for p in tmp_path.iterdir()}
+    assert len(names) <= 10
+    assert "k0" not in names
+    assert store.mget(["k11"]) == [b"v"]
+
+def test_embedding_batcher_coalesces_concurrent_calls():
+    import asyncio
+    from app import EmbeddingBatcher
+
+    class FakeEmbeddings:
+        def __init__(self):
+            self.calls = []
+
+        async def aembed_documents(self, texts):
+            self.calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+    async def run():
+        fake = FakeEmbeddings()
+        batcher = EmbeddingBatcher(fake, max_batch=32, max_wait_ms=20)
+        vectors = await asyncio.gather(*(batcher.embed("q" * n) for n in range(1, 6)))
+        return fake.calls, vectors
+
+    calls, vectors = asyncio.run(run())
+    assert len(calls) == 1
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+
+
+def test_embedding_batcher_fails_callers_on_short_response():
+    import asyncio
+    from app import EmbeddingBatcher
+
+    class ShortEmbeddings:
+        async def aembed_documents(self, texts):
+            return [[0.0]] * (len(texts) - 1)
+
+    async def run():
+        batcher = EmbeddingBatcher(ShortEmbeddings(), max_wait_ms=20)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True), timeout=2
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_embedding_batcher_cancels_worker_when_loop_changes():
+    import asyncio
+    import threading
+    from app import EmbeddingBatcher
+
+    class FakeEmbeddings:
+        async def aembed_documents(self, texts):
+            return [[1.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(FakeEmbeddings(), max_wait_ms=1)
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(batcher.embed("a"), old_loop).result(timeout=2)
+        old_worker = batcher._worker
+        assert asyncio.run(batcher.embed("b")) == [1.0]
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), old_loop).result(timeout=2)
+        assert old_worker.cancelled()
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join(timeout=2)
+
+def test_auth_me_token_cache_respects_expiry(monkeypatch):
+    import app as app_module
+    from app import create_access_token, decode_token
+    token = create_access_token({"sub": "u1", "email": "a@b.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    r = client.get("/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert r.json() == {"id": "u1", "email": "a@b.com"}
+    exp = decode_token(token)["exp"]
+    hits = app_module._verify_token.cache_info().hits
+    monkeypatch.setattr(app_module.time, "time", lambda: exp + 1)
+    r = client.get("/auth/me", headers=headers)
+    assert r.status_code == 401
+    assert app_module._verify_token.cache_info().hits > hits
+
+def test_check_password_runs_verify_for_unknown_user():
+    from app import check_password, get_dummy_hash, pwd_context
+    assert check_password("x" * 12, None) == (False, None)
+    assert check_password("x" * 12, {"email": "a@b.com"}) == (False, None)
+    assert pwd_context.verify("x" * 12, get_dummy_hash())
+    current = pwd_context.hash("x" * 12)
+    user = {"email": "a@b.com", "password": current}
+    assert check_password("x" * 12, user) == (True, None)
+    assert check_password("wrong-password", user) == (False, None)
+
+def test_check_password_verifies_even_without_stored_hash(monkeypatch):
+    import app as app_module
+    app_module.get_dummy_hash()
+    calls = []
+    real = app_module.pwd_context.verify_and_update
+
+    def counting(secret, hash):
+        calls.append(hash)
+        return real(secret, hash)
+
+    monkeypatch.setattr(app_module.pwd_context, "verify_and_update", counting)
+    app_module.check_password("x" * 12, None)
+    assert calls == [app_module.get_dummy_hash()]
+    app_module.check_password("x" * 12, {"email": "a@b.com"})
+    assert calls == [app_module.get_dummy_hash()] * 2
+
+def test_dummy_hash_cost_matches_stored_hashes():
+    from passlib.context import CryptContext
+    from passlib.hash import bcrypt
+    from app import check_password, get_dummy_hash, BCRYPT_ROUNDS, LEGACY_BCRYPT_ROUNDS
+    # Accounts created before the rounds pin carry passlib's default cost
+    legacy = CryptContext(schemes=["bcrypt"]).hash("legacy-password")
+    assert bcrypt.from_string(get_dummy_hash()).rounds == bcrypt.from_string(legacy).rounds == LEGACY_BCRYPT_ROUNDS
+    ok, new_hash = check_password("legacy-password", {"email": "a@b.com", "password": legacy})
+    assert ok and bcrypt.from_string(new_hash).rounds == BCRYPT_ROUNDS
+
+def test_auth_login_matches_stored_email_verbatim(monkeypatch):
+    import app as app_module
+    stored = {"_id": "u1", "email": "User@Example.COM", "password": app_module.get_dummy_hash()}
+
+    class FakeUsers:
+        async def find_one(self, query):
+            return stored if query == {"email": stored["email"]} else None
+
+        async def update_one(self, query, update):
+            stored["password"] = update["$set"]["password"]
+
+    async def fake_get_db():
+        return {"users": FakeUsers()}
+
+    monkeypatch.setattr(app_module, "get_db", fake_get_db)
+    r = client.post("/auth/login", json={"email": "User@Example.COM", "password": "x" * 12})
+    assert r.status_code == 200
+    assert r.json()["user"]["email"] == "User@Example.COM"
+    # The legacy-cost hash was upgraded on login
+    assert stored["password"].startswith(f"$2b${app_module.BCRYPT_ROUNDS}$")
+
+def test_auth_signup_guards_duplicates_without_unique_index(monkeypatch):
+    import app as app_module
+
+    class FakeUsers:
+        async def find_one(self, query):
+            return {"_id": "u1", "email": query["email"]}
+
+        async def insert_one(self, doc):
+            raise AssertionError("duplicate signup reached insert_one")
+
+    async def fake_get_db():
+        return {"users": FakeUsers()}
+
+    monkeypatch.setattr(app_module, "get_db", fake_get_db)
+    monkeypatch.setattr(app_module, "_email_index_ready", False)
+    r = client.post("/auth/signup", json={"email": "test@test.com", "password": "test1234"})
+    assert r.status_code == 400
+
+def test_chat_stream_releases_openai_slot_before_client_finishes(monkeypatch):
+    import asyncio
+    import app as app_module
+    from langchain_core.language_models.fake import FakeStreamingListLLM
+    from langchain_core.output_parsers import StrOutputParser
+
+    monkeypatch.setattr(app_module, "rag_chain", FakeStreamingListLLM(responses=["abc"]) | StrOutputParser())
+    monkeypatch.setattr(app_module, "answer_cache", app_module.QueryCache())
+
+    async def run():
+        monkeypatch.setattr(app_module, "openai_slots", asyncio.Semaphore(1))
+        response = await app_module.chat(app_module.Query(question="slot test"))
+        body = response.body_iterator
+        first = await body.__anext__()
+        # Read one model chunk, then stall like a slow client
+        rest = [await body.__anext__()]
+        await asyncio.sleep(0.1)
+        released = not app_module.openai_slots.locked()
+        rest += [chunk async for chunk in body]
+        return first, released, rest
+
+    first, released, rest = asyncio.run(run())
+    assert json.loads(first[len("data: "):]) == {"delta": app_module.ANSWER_PREFIX}
+    assert released
+    deltas = [json.loads(e[len("data: "):])["delta"] for e in rest]
+    assert "".join(deltas) == "abc"
+
+def test_chats_list_projection_and_shape(monkeypatch):
+    from datetime import datetime
+    import app as app_module
+    seen = {}
+
+    class FakeCursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        def sort(self, field, direction):
+            seen["sort"] = (field, direction)
+            return self
+
+        def limit(self, n):
+            seen["limit"] = n
+            return self
+
+        async def __aiter__(self):
+            for doc in self.docs:
+                yield doc
+
+    class FakeChats:
+        def find(self, query, projection):
+            seen["query"], seen["projection"] = query, projection
+            return FakeCursor([
+                {"question": "q1", "answer": "a1", "error": "", "createdAt": datetime(2026, 1, 2, 3, 4, 5)},
+                {"question": "q2"},
+            ])
+
+    async def fake_get_db():
+        return {"chats": FakeChats()}
+
+    monkeypatch.setattr(app_module, "get_db", fake_get_db)
+    monkeypatch.setitem(app.dependency_overrides, app_module.get_current_user, lambda: {"id": "u1", "email": "a@b.com"})
+    r = client.get("/chats")
+    assert r.status_code == 200
+    assert seen == {
+        "query": {"userId": "u1"},
+        "projection": {"_id": 0, "question": 1, "answer": 1, "error": 1, "createdAt": 1},
+        "sort": ("createdAt", 1),
+        "limit": 100,
+    }
+    assert r.json() == {"chats": [
+        {"question": "q1", "answer": "a1", "error": "", "createdAt": "2026-01-02T03:04:05"},
+        {"question": "q2", "answer": "", "error": "", "createdAt": None},
+    ]}